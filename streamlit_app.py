@@ -1,323 +1,576 @@
+import io
+
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import streamlit as st
-import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import numpy as np
-from collections import Counter
 
 # Set page config
 st.set_page_config(page_title="Student Registration Analysis", layout="wide")
 
-@st.cache_data
+# Columns expected in the uploaded CSV; read as plain strings so the
+# parser skips per-column type inference
+EXPECTED_COLUMNS = [
+    'nama_calon_murid', 'kategori', 'jalur', 'tujuan1', 'tujuan2', 'tujuan3',
+    'kampus1', 'kampus2', 'kampus3', 'domisili', 'alamat_propinsi',
+    'alamat_kabupaten', 'asal_sekolah', 'propinsi_asal_sekolah',
+    'ayah_pendidikan', 'ayah_pekerjaan', 'ayah_penghasilan',
+    'ibu_pendidikan', 'ibu_pekerjaan', 'ibu_penghasilan'
+]
+
+# Uploads above this size are read in chunks to bound peak memory
+LARGE_FILE_BYTES = 50 * 1024 * 1024
+
+@st.cache_data(persist='disk', max_entries=2)
 def load_data(file):
     """Load and preprocess the data"""
+    read_kwargs = dict(delimiter=';', quotechar='"', encoding='utf-8',
+                       dtype={col: 'string' for col in EXPECTED_COLUMNS})
     try:
-        df = pd.read_csv(file, delimiter=';', quotechar='"', on_bad_lines='skip', encoding='utf-8')
+        # Large uploads: stream in chunks and keep only the expected columns,
+        # so re-uploads of the same file hit the disk cache instead of a parse
+        if getattr(file, 'size', 0) > LARGE_FILE_BYTES:
+            parts = list(pd.read_csv(file, on_bad_lines='skip', chunksize=200_000,
+                                     usecols=lambda c: c in EXPECTED_COLUMNS,
+                                     **read_kwargs))
+            return pd.concat(parts, ignore_index=True)
+        try:
+            # PyArrow parses the CSV multi-threaded and keeps strings Arrow-backed
+            df = pd.read_csv(file, engine='pyarrow', dtype_backend='pyarrow',
+                             **read_kwargs)
+        except (ImportError, ValueError):
+            file.seek(0)
+            df = pd.read_csv(file, on_bad_lines='skip', **read_kwargs)
         return df
     except Exception as e:
         st.error(f"Error loading CSV: {str(e)}")
         return None
 
+# Low-cardinality string columns stored as category dtype: this shrinks
+# memory and lets value_counts count integer codes instead of hashing strings
+CATEGORICAL_COLUMNS = ['kategori', 'tujuan1', 'tujuan2', 'tujuan3',
+                       'kampus1', 'kampus2', 'kampus3', 'domisili',
+                       'alamat_propinsi', 'alamat_kabupaten', 'asal_sekolah',
+                       'propinsi_asal_sekolah', 'ayah_pendidikan', 'ayah_pekerjaan',
+                       'ibu_pendidikan', 'ibu_pekerjaan']
+
+@st.cache_data(show_spinner="Membersihkan data…", max_entries=4)
 def clean_data(df):
     """Clean and preprocess the data"""
     # Clean salary columns by removing '\N' and converting to appropriate categories
     salary_columns = ['ayah_penghasilan', 'ibu_penghasilan']
     for col in salary_columns:
         df[col] = df[col].replace('\\N', '0 - 2.500.000')
-    
-    # Fill missing values
-    df = df.fillna('Tidak Diketahui')
-    
+
+    # Convert repeated strings to categoricals once, up front
+    df[CATEGORICAL_COLUMNS] = df[CATEGORICAL_COLUMNS].astype('category')
+
+    # Ordered categories keep the salary charts in range order without reindexing
+    for col in salary_columns:
+        df[col] = df[col].astype(SALARY_DTYPE)
+
+    # Parent education columns share one dtype so their counts line up on a
+    # common index without an outer join at chart time
+    edu_dtype = pd.CategoricalDtype(
+        df['ayah_pendidikan'].cat.categories.union(df['ibu_pendidikan'].cat.categories))
+    for col in ('ayah_pendidikan', 'ibu_pendidikan'):
+        df[col] = df[col].astype(edu_dtype)
+
+    # Fill missing values only in the columns the dashboard reads, after the
+    # categorical conversion so the fill keeps the category codes intact
+    for col in CATEGORICAL_COLUMNS + salary_columns:
+        if 'Tidak Diketahui' not in df[col].cat.categories:
+            df[col] = df[col].cat.add_categories(['Tidak Diketahui'])
+        df[col] = df[col].fillna('Tidak Diketahui')
+
     return df
 
-def create_salary_order():
-    """Create ordered salary categories"""
-    return ['0 - 2.500.000', '2.500.001 - 5.000.000', '5.000.001 - 7.500.000', 
-            '7.500.001 - 10.000.000', '10.000.001 - 20.000.000', '20.000.001 - 50.000.000', 
-            '50.000.001 - 100.000.000']
+# Columns whose value_counts feed the analysis charts
+ANALYSIS_COLUMNS = ['domisili', 'kategori', 'alamat_propinsi', 'alamat_kabupaten',
+                    'tujuan1', 'ayah_pendidikan', 'ibu_pendidikan',
+                    'ayah_pekerjaan', 'ibu_pekerjaan', 'ayah_penghasilan',
+                    'ibu_penghasilan', 'propinsi_asal_sekolah', 'asal_sekolah']
+
+# Columns where only the top-k entries are ever shown
+TOP_K_COLUMNS = {'alamat_kabupaten': 10, 'asal_sekolah': 10,
+                 'ayah_pekerjaan': 8, 'ibu_pekerjaan': 8}
+
+def top_k_counts(cat_series, k):
+    """Top-k counts of a categorical column, without sorting the full histogram.
+
+    bincount over the category codes plus argpartition is O(U) in the number
+    of unique values, versus the O(U log U) sort inside value_counts.
+    """
+    codes = cat_series.cat.codes.to_numpy()
+    counts = np.bincount(codes[codes >= 0],
+                         minlength=len(cat_series.cat.categories))
+    k = min(k, len(counts))
+    idx = np.argpartition(-counts, k - 1)[:k]
+    idx = idx[np.argsort(-counts[idx])]
+    return pd.Series(counts[idx], index=cat_series.cat.categories[idx])
+
+@st.cache_data(show_spinner="Mempersiapkan data…", max_entries=4)
+def prepare_data(raw_df):
+    """Clean the data and precompute the counts used across the analyses.
+
+    Cached so that toggling sidebar options does not re-run the cleaning
+    and aggregation on every rerun.
+    """
+    df = clean_data(raw_df)
+
+    counts = {col: df[col].value_counts() for col in ANALYSIS_COLUMNS
+              if col not in TOP_K_COLUMNS}
+    for col, k in TOP_K_COLUMNS.items():
+        counts[col] = top_k_counts(df[col], k)
+
+    # Campus preferences combine the three choice columns; concat stays in
+    # pandas instead of round-tripping through Python lists
+    campus_cols = ['kampus1', 'kampus2', 'kampus3']
+    counts['kampus'] = pd.concat([df[col] for col in campus_cols],
+                                 ignore_index=True).value_counts()
+
+    # Combined family income: sum the upper bound of each parent's salary
+    # range and bin the totals in one vectorized pass
+    ayah_max = df['ayah_penghasilan'].map(INCOME_MAP).fillna(0).to_numpy(np.int64)
+    ibu_max = df['ibu_penghasilan'].map(INCOME_MAP).fillna(0).to_numpy(np.int64)
+    total_income = ayah_max + ibu_max
+    df['combined_income_category'] = INCOME_LABELS[np.searchsorted(INCOME_BINS, total_income, side='left')]
+    counts['combined_income'] = df['combined_income_category'].value_counts()
+
+    # Scalars behind the insight texts and summary metrics, so rendering a
+    # section does no pandas work at all
+    total = len(df)
+    insights = {
+        'total': total,
+        'domisili': (counts['domisili'].index[0], int(counts['domisili'].iloc[0]),
+                     counts['domisili'].iloc[0] / total * 100),
+        'kategori': (counts['kategori'].index[0], int(counts['kategori'].iloc[0])),
+        'propinsi': (counts['alamat_propinsi'].index[0],
+                     int(counts['alamat_propinsi'].iloc[0]),
+                     len(counts['alamat_propinsi'])),
+        'kabupaten': (counts['alamat_kabupaten'].index[0],
+                      int(counts['alamat_kabupaten'].iloc[0])),
+        'tujuan1': (counts['tujuan1'].index[0], int(counts['tujuan1'].iloc[0])),
+        'kampus': (counts['kampus'].index[0], int(counts['kampus'].iloc[0])),
+        'ayah_pekerjaan': (counts['ayah_pekerjaan'].index[0],
+                           int(counts['ayah_pekerjaan'].iloc[0])),
+        'ibu_pekerjaan': (counts['ibu_pekerjaan'].index[0],
+                          int(counts['ibu_pekerjaan'].iloc[0])),
+        'jumlah_propinsi': df['alamat_propinsi'].nunique(),
+        'jumlah_sekolah': df['asal_sekolah'].nunique(),
+        'jawa_barat': int((df['domisili'] == 'JAWA BARAT').sum()),
+    }
+
+    return {'df': df, 'counts': counts, 'insights': insights}
 
-def demographic_analysis(df):
+# Salary ranges in ascending order; the ordered dtype keeps the income
+# charts sorted by range rather than by count
+SALARY_ORDER = ('0 - 2.500.000', '2.500.001 - 5.000.000', '5.000.001 - 7.500.000',
+                '7.500.001 - 10.000.000', '10.000.001 - 20.000.000',
+                '20.000.001 - 50.000.000', '50.000.001 - 100.000.000')
+SALARY_DTYPE = pd.CategoricalDtype(SALARY_ORDER, ordered=True)
+
+# Upper bound (in Rupiah) of each salary range, used to estimate combined family income
+INCOME_MAP = {
+    '0 - 2.500.000': 2_500_000,
+    '2.500.001 - 5.000.000': 5_000_000,
+    '5.000.001 - 7.500.000': 7_500_000,
+    '7.500.001 - 10.000.000': 10_000_000,
+    '10.000.001 - 20.000.000': 20_000_000,
+    '20.000.001 - 50.000.000': 50_000_000,
+    '50.000.001 - 100.000.000': 100_000_000,
+}
+
+# Bin edges and labels for the combined family income categories
+INCOME_BINS = np.array([5_000_000, 10_000_000, 20_000_000, 50_000_000])
+INCOME_LABELS = np.array(["≤ 5 Juta", "5-10 Juta", "10-20 Juta", "20-50 Juta", "> 50 Juta"])
+
+@st.cache_data(max_entries=2)
+def to_csv_bytes(df):
+    """Serialize the processed frame for download, once per dataset"""
+    try:
+        # PyArrow writes CSV several times faster than pandas' text path
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+        buf = io.BytesIO()
+        pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), buf)
+        return buf.getvalue()
+    except ImportError:
+        return df.to_csv(index=False).encode('utf-8')
+
+def topk_with_other(counts, k=12):
+    """Cap a value_counts Series at the top-k slices plus a 'Lainnya' bucket.
+
+    Keeps pie charts readable and the Plotly payload small when a column
+    has dozens of unique values.
+    """
+    if len(counts) <= k:
+        return counts
+    head = counts.head(k)
+    other = counts.iloc[k:].sum()
+    if other:
+        head = pd.concat([head, pd.Series({'Lainnya': other})])
+    return head
+
+@st.cache_resource(max_entries=4)
+def build_demographic_figs(counts):
+    """Build the demographic figures once per dataset"""
+    domicile_pie = topk_with_other(counts['domisili'])
+    pie = go.Figure(go.Pie(values=domicile_pie.values, labels=domicile_pie.index))
+    pie.update_layout(title="Sebaran Domisili Calon Murid")
+
+    category_counts = counts['kategori']
+    bar = go.Figure(go.Bar(x=category_counts.index, y=category_counts.values))
+    bar.update_layout(title="Jumlah Calon Murid per Kategori",
+                      xaxis_title="Kategori", yaxis_title="Jumlah")
+
+    return {'domisili': pie, 'kategori': bar}
+
+@st.fragment
+def demographic_analysis(bundle):
     """Perform demographic analysis"""
+    if not st.sidebar.checkbox('Analisis Demografis', True):
+        return
+
     st.header("📊 Analisis Demografis")
-    
+
+    figs = build_demographic_figs(bundle['counts'])
+    insights = bundle['insights']
+
     col1, col2 = st.columns(2)
-    
+
     with col1:
         # Distribution by domicile
         st.subheader("Distribusi Berdasarkan Domisili")
-        domicile_counts = df['domisili'].value_counts()
-        fig = px.pie(values=domicile_counts.values, names=domicile_counts.index,
-                    title="Sebaran Domisili Calon Murid")
-        st.plotly_chart(fig, use_container_width=True)
-        
+        st.plotly_chart(figs['domisili'], use_container_width=True)
+
         # Insights
-        st.info(f"**Insight:** {domicile_counts.index[0]} mendominasi dengan {domicile_counts.iloc[0]} siswa ({domicile_counts.iloc[0]/len(df)*100:.1f}%)")
-    
+        dom_name, dom_n, dom_pct = insights['domisili']
+        st.info(f"**Insight:** {dom_name} mendominasi dengan {dom_n} siswa ({dom_pct:.1f}%)")
+
     with col2:
         # Distribution by category
         st.subheader("Distribusi Berdasarkan Kategori")
-        category_counts = df['kategori'].value_counts()
-        fig = px.bar(x=category_counts.index, y=category_counts.values,
-                    title="Jumlah Calon Murid per Kategori")
-        fig.update_layout(xaxis_title="Kategori", yaxis_title="Jumlah")
-        st.plotly_chart(fig, use_container_width=True)
-        
-        st.info(f"**Insight:** Mayoritas pendaftar adalah kategori {category_counts.index[0]} dengan {category_counts.iloc[0]} siswa")
+        st.plotly_chart(figs['kategori'], use_container_width=True)
 
-def geographical_analysis(df):
+        kat_name, kat_n = insights['kategori']
+        st.info(f"**Insight:** Mayoritas pendaftar adalah kategori {kat_name} dengan {kat_n} siswa")
+
+    st.markdown("---")
+
+@st.cache_resource(max_entries=4)
+def build_geographical_figs(counts):
+    """Build the geographical figures once per dataset"""
+    province_counts = counts['alamat_propinsi']
+    province = go.Figure(go.Bar(x=province_counts.values, y=province_counts.index,
+                                orientation='h'))
+    province.update_layout(title="Distribusi Provinsi Asal",
+                           yaxis_title="Provinsi", xaxis_title="Jumlah Siswa")
+
+    regency_counts = counts['alamat_kabupaten'].head(10)
+    regency = go.Figure(go.Bar(x=regency_counts.values, y=regency_counts.index,
+                               orientation='h'))
+    regency.update_layout(title="Top 10 Kabupaten/Kota Asal",
+                          yaxis_title="Kabupaten/Kota", xaxis_title="Jumlah Siswa")
+
+    return {'propinsi': province, 'kabupaten': regency}
+
+@st.fragment
+def geographical_analysis(bundle):
     """Analyze geographical distribution"""
+    if not st.sidebar.checkbox('Analisis Geografis', True):
+        return
+
     st.header("🗺️ Analisis Geografis")
-    
+
+    figs = build_geographical_figs(bundle['counts'])
+    prov_name, prov_n, prov_total = bundle['insights']['propinsi']
+    kab_name, kab_n = bundle['insights']['kabupaten']
+
     col1, col2 = st.columns(2)
-    
+
     with col1:
         # Province distribution
         st.subheader("Sebaran Berdasarkan Provinsi")
-        province_counts = df['alamat_propinsi'].value_counts()
-        fig = px.bar(x=province_counts.values, y=province_counts.index,
-                    orientation='h', title="Distribusi Provinsi Asal")
-        fig.update_layout(yaxis_title="Provinsi", xaxis_title="Jumlah Siswa")
-        st.plotly_chart(fig, use_container_width=True)
-    
+        st.plotly_chart(figs['propinsi'], use_container_width=True)
+
     with col2:
         # Regency distribution (top 10)
         st.subheader("Top 10 Kabupaten/Kota")
-        regency_counts = df['alamat_kabupaten'].value_counts().head(10)
-        fig = px.bar(x=regency_counts.values, y=regency_counts.index,
-                    orientation='h', title="Top 10 Kabupaten/Kota Asal")
-        fig.update_layout(yaxis_title="Kabupaten/Kota", xaxis_title="Jumlah Siswa")
-        st.plotly_chart(fig, use_container_width=True)
-    
+        st.plotly_chart(figs['kabupaten'], use_container_width=True)
+
     # Geographic insights
     st.info(f"""
     **Insights Geografis:**
-    - Provinsi dominan: {province_counts.index[0]} ({province_counts.iloc[0]} siswa)
-    - Kabupaten/Kota terbanyak: {regency_counts.index[0]} ({regency_counts.iloc[0]} siswa)
-    - Total provinsi yang terwakili: {len(province_counts)} provinsi
+    - Provinsi dominan: {prov_name} ({prov_n} siswa)
+    - Kabupaten/Kota terbanyak: {kab_name} ({kab_n} siswa)
+    - Total provinsi yang terwakili: {prov_total} provinsi
     """)
 
-def school_preference_analysis(df):
+    st.markdown("---")
+
+@st.cache_resource(max_entries=4)
+def build_school_preference_figs(counts):
+    """Build the school preference figures once per dataset"""
+    tujuan1_pie = topk_with_other(counts['tujuan1'])
+    tujuan1 = go.Figure(go.Pie(values=tujuan1_pie.values, labels=tujuan1_pie.index))
+    tujuan1.update_layout(title="Distribusi Pilihan Pertama")
+
+    campus_counts = counts['kampus']
+    campus = go.Figure(go.Bar(x=campus_counts.index, y=campus_counts.values))
+    campus.update_layout(title="Popularitas Kampus",
+                         xaxis_title="Kampus", yaxis_title="Jumlah Pilihan")
+
+    return {'tujuan1': tujuan1, 'kampus': campus}
+
+@st.fragment
+def school_preference_analysis(bundle):
     """Analyze school preferences"""
+    if not st.sidebar.checkbox('Analisis Preferensi Sekolah', True):
+        return
+
     st.header("🎯 Analisis Preferensi Sekolah")
-    
+
+    figs = build_school_preference_figs(bundle['counts'])
+    tujuan1_name, tujuan1_n = bundle['insights']['tujuan1']
+    kampus_name, kampus_n = bundle['insights']['kampus']
+
     col1, col2 = st.columns(2)
-    
+
     with col1:
         # First choice preferences
         st.subheader("Pilihan Pertama (Tujuan 1)")
-        tujuan1_counts = df['tujuan1'].value_counts()
-        fig = px.pie(values=tujuan1_counts.values, names=tujuan1_counts.index,
-                    title="Distribusi Pilihan Pertama")
-        st.plotly_chart(fig, use_container_width=True)
-    
+        st.plotly_chart(figs['tujuan1'], use_container_width=True)
+
     with col2:
         # Campus preferences
         st.subheader("Preferensi Kampus")
-        campus_cols = ['kampus1', 'kampus2', 'kampus3']
-        all_campus = []
-        for col in campus_cols:
-            all_campus.extend(df[col].dropna().tolist())
-        
-        campus_counts = pd.Series(all_campus).value_counts()
-        fig = px.bar(x=campus_counts.index, y=campus_counts.values,
-                    title="Popularitas Kampus")
-        fig.update_layout(xaxis_title="Kampus", yaxis_title="Jumlah Pilihan")
-        st.plotly_chart(fig, use_container_width=True)
-    
+        st.plotly_chart(figs['kampus'], use_container_width=True)
+
     st.success(f"""
     **Insights Preferensi:**
-    - Pilihan pertama terpopuler: {tujuan1_counts.index[0]} ({tujuan1_counts.iloc[0]} siswa)
-    - Kampus terfavorit: {campus_counts.index[0]} ({campus_counts.iloc[0]} pilihan)
+    - Pilihan pertama terpopuler: {tujuan1_name} ({tujuan1_n} siswa)
+    - Kampus terfavorit: {kampus_name} ({kampus_n} pilihan)
     """)
 
-def parent_education_analysis(df):
+    st.markdown("---")
+
+@st.cache_resource(max_entries=4)
+def build_parent_education_figs(counts):
+    """Build the parent education figures once per dataset"""
+    ayah_edu = counts['ayah_pendidikan']
+    ibu_edu = counts['ibu_pendidikan']
+
+    ayah_edu_pie = topk_with_other(ayah_edu)
+    ayah = go.Figure(go.Pie(values=ayah_edu_pie.values, labels=ayah_edu_pie.index))
+    ayah.update_layout(title="Distribusi Pendidikan Ayah")
+
+    ibu_edu_pie = topk_with_other(ibu_edu)
+    ibu = go.Figure(go.Pie(values=ibu_edu_pie.values, labels=ibu_edu_pie.index))
+    ibu.update_layout(title="Distribusi Pendidikan Ibu")
+
+    education_comparison = (
+        pd.concat({'Ayah': ayah_edu, 'Ibu': ibu_edu}, axis=1)
+        .reindex(ayah_edu.index.union(ibu_edu.index), fill_value=0)
+        .astype('int64')
+    )
+    comparison = go.Figure([
+        go.Bar(name=parent, x=education_comparison.index, y=education_comparison[parent])
+        for parent in education_comparison.columns
+    ])
+    comparison.update_layout(title="Perbandingan Tingkat Pendidikan Ayah vs Ibu",
+                             barmode='relative',
+                             xaxis_title="Tingkat Pendidikan", yaxis_title="Jumlah")
+
+    return {'ayah': ayah, 'ibu': ibu, 'perbandingan': comparison}
+
+@st.fragment
+def parent_education_analysis(bundle):
     """Analyze parent education levels"""
+    if not st.sidebar.checkbox('Pendidikan Orang Tua', True):
+        return
+
     st.header("🎓 Analisis Pendidikan Orang Tua")
-    
+
+    figs = build_parent_education_figs(bundle['counts'])
+
     col1, col2 = st.columns(2)
-    
+
     with col1:
         # Father's education
         st.subheader("Tingkat Pendidikan Ayah")
-        ayah_edu = df['ayah_pendidikan'].value_counts()
-        fig = px.pie(values=ayah_edu.values, names=ayah_edu.index,
-                    title="Distribusi Pendidikan Ayah")
-        st.plotly_chart(fig, use_container_width=True)
-    
+        st.plotly_chart(figs['ayah'], use_container_width=True)
+
     with col2:
         # Mother's education
         st.subheader("Tingkat Pendidikan Ibu")
-        ibu_edu = df['ibu_pendidikan'].value_counts()
-        fig = px.pie(values=ibu_edu.values, names=ibu_edu.index,
-                    title="Distribusi Pendidikan Ibu")
-        st.plotly_chart(fig, use_container_width=True)
-    
+        st.plotly_chart(figs['ibu'], use_container_width=True)
+
     # Education comparison
     st.subheader("Perbandingan Tingkat Pendidikan Orang Tua")
-    education_comparison = pd.DataFrame({
-        'Ayah': ayah_edu,
-        'Ibu': ibu_edu
-    }).fillna(0)
-    
-    fig = px.bar(education_comparison, 
-                title="Perbandingan Tingkat Pendidikan Ayah vs Ibu")
-    fig.update_layout(xaxis_title="Tingkat Pendidikan", yaxis_title="Jumlah")
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(figs['perbandingan'], use_container_width=True)
+
+    st.markdown("---")
 
-def parent_occupation_analysis(df):
+@st.cache_resource(max_entries=4)
+def build_parent_occupation_figs(counts):
+    """Build the parent occupation figures once per dataset"""
+    ayah_job = counts['ayah_pekerjaan'].head(8)
+    ayah = go.Figure(go.Bar(x=ayah_job.values, y=ayah_job.index, orientation='h'))
+    ayah.update_layout(title="Top 8 Pekerjaan Ayah")
+
+    ibu_job = counts['ibu_pekerjaan'].head(8)
+    ibu = go.Figure(go.Bar(x=ibu_job.values, y=ibu_job.index, orientation='h'))
+    ibu.update_layout(title="Top 8 Pekerjaan Ibu")
+
+    return {'ayah': ayah, 'ibu': ibu}
+
+@st.fragment
+def parent_occupation_analysis(bundle):
     """Analyze parent occupations"""
+    if not st.sidebar.checkbox('Pekerjaan Orang Tua', True):
+        return
+
     st.header("💼 Analisis Pekerjaan Orang Tua")
-    
+
+    figs = build_parent_occupation_figs(bundle['counts'])
+    ayah_name, ayah_n = bundle['insights']['ayah_pekerjaan']
+    ibu_name, ibu_n = bundle['insights']['ibu_pekerjaan']
+
     col1, col2 = st.columns(2)
-    
+
     with col1:
         # Father's occupation
         st.subheader("Pekerjaan Ayah")
-        ayah_job = df['ayah_pekerjaan'].value_counts().head(8)
-        fig = px.bar(x=ayah_job.values, y=ayah_job.index,
-                    orientation='h', title="Top 8 Pekerjaan Ayah")
-        st.plotly_chart(fig, use_container_width=True)
-    
+        st.plotly_chart(figs['ayah'], use_container_width=True)
+
     with col2:
         # Mother's occupation
         st.subheader("Pekerjaan Ibu")
-        ibu_job = df['ibu_pekerjaan'].value_counts().head(8)
-        fig = px.bar(x=ibu_job.values, y=ibu_job.index,
-                    orientation='h', title="Top 8 Pekerjaan Ibu")
-        st.plotly_chart(fig, use_container_width=True)
-    
+        st.plotly_chart(figs['ibu'], use_container_width=True)
+
     # Occupation insights
     st.info(f"""
     **Insights Pekerjaan:**
-    - Pekerjaan ayah terbanyak: {ayah_job.index[0]} ({ayah_job.iloc[0]} orang)
-    - Pekerjaan ibu terbanyak: {ibu_job.index[0]} ({ibu_job.iloc[0]} orang)
+    - Pekerjaan ayah terbanyak: {ayah_name} ({ayah_n} orang)
+    - Pekerjaan ibu terbanyak: {ibu_name} ({ibu_n} orang)
     """)
 
-def income_analysis(df):
+    st.markdown("---")
+
+@st.cache_resource(max_entries=4)
+def build_income_figs(counts):
+    """Build the income figures once per dataset"""
+    # The ordered categorical index puts the ranges in salary order
+    ayah_income_ordered = counts['ayah_penghasilan'].sort_index()
+    ayah = go.Figure(go.Bar(x=ayah_income_ordered.index, y=ayah_income_ordered.values))
+    ayah.update_layout(title="Distribusi Penghasilan Ayah",
+                       xaxis_title="Range Penghasilan", yaxis_title="Jumlah",
+                       xaxis={'tickangle': 45})
+
+    ibu_income_ordered = counts['ibu_penghasilan'].sort_index()
+    ibu = go.Figure(go.Bar(x=ibu_income_ordered.index, y=ibu_income_ordered.values))
+    ibu.update_layout(title="Distribusi Penghasilan Ibu",
+                      xaxis_title="Range Penghasilan", yaxis_title="Jumlah",
+                      xaxis={'tickangle': 45})
+
+    combined_income = topk_with_other(counts['combined_income'])
+    combined = go.Figure(go.Pie(values=combined_income.values, labels=combined_income.index))
+    combined.update_layout(title="Estimasi Penghasilan Keluarga Gabungan")
+
+    return {'ayah': ayah, 'ibu': ibu, 'gabungan': combined}
+
+@st.fragment
+def income_analysis(bundle):
     """Analyze parent income levels"""
+    if not st.sidebar.checkbox('Analisis Penghasilan', True):
+        return
+
     st.header("💰 Analisis Penghasilan Orang Tua")
-    
-    salary_order = create_salary_order()
-    
+
+    figs = build_income_figs(bundle['counts'])
+
     col1, col2 = st.columns(2)
-    
+
     with col1:
         # Father's income
         st.subheader("Penghasilan Ayah")
-        ayah_income = df['ayah_penghasilan'].value_counts()
-        # Reorder based on salary order
-        ayah_income_ordered = ayah_income.reindex([x for x in salary_order if x in ayah_income.index])
-        
-        fig = px.bar(x=ayah_income_ordered.index, y=ayah_income_ordered.values,
-                    title="Distribusi Penghasilan Ayah")
-        fig.update_layout(xaxis_title="Range Penghasilan", yaxis_title="Jumlah",
-                         xaxis={'tickangle': 45})
-        st.plotly_chart(fig, use_container_width=True)
-    
+        st.plotly_chart(figs['ayah'], use_container_width=True)
+
     with col2:
         # Mother's income
         st.subheader("Penghasilan Ibu")
-        ibu_income = df['ibu_penghasilan'].value_counts()
-        ibu_income_ordered = ibu_income.reindex([x for x in salary_order if x in ibu_income.index])
-        
-        fig = px.bar(x=ibu_income_ordered.index, y=ibu_income_ordered.values,
-                    title="Distribusi Penghasilan Ibu")
-        fig.update_layout(xaxis_title="Range Penghasilan", yaxis_title="Jumlah",
-                         xaxis={'tickangle': 45})
-        st.plotly_chart(fig, use_container_width=True)
-    
+        st.plotly_chart(figs['ibu'], use_container_width=True)
+
     # Combined family income analysis
     st.subheader("Analisis Gabungan Penghasilan Keluarga")
-    
-    # Calculate combined income categories
-    def get_income_category(father_income, mother_income):
-        father_max = get_max_income(father_income)
-        mother_max = get_max_income(mother_income)
-        total = father_max + mother_max
-        
-        if total <= 5000000:
-            return "≤ 5 Juta"
-        elif total <= 10000000:
-            return "5-10 Juta"
-        elif total <= 20000000:
-            return "10-20 Juta"
-        elif total <= 50000000:
-            return "20-50 Juta"
-        else:
-            return "> 50 Juta"
-    
-    def get_max_income(income_range):
-        if income_range == '0 - 2.500.000':
-            return 2500000
-        elif income_range == '2.500.001 - 5.000.000':
-            return 5000000
-        elif income_range == '5.000.001 - 7.500.000':
-            return 7500000
-        elif income_range == '7.500.001 - 10.000.000':
-            return 10000000
-        elif income_range == '10.000.001 - 20.000.000':
-            return 20000000
-        elif income_range == '20.000.001 - 50.000.000':
-            return 50000000
-        elif income_range == '50.000.001 - 100.000.000':
-            return 100000000
-        else:
-            return 0
-    
-    df['combined_income_category'] = df.apply(
-        lambda row: get_income_category(row['ayah_penghasilan'], row['ibu_penghasilan']), 
-        axis=1
-    )
-    
-    combined_income = df['combined_income_category'].value_counts()
-    fig = px.pie(values=combined_income.values, names=combined_income.index,
-                title="Estimasi Penghasilan Keluarga Gabungan")
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(figs['gabungan'], use_container_width=True)
+
+    st.markdown("---")
+
+@st.cache_resource(max_entries=4)
+def build_school_origin_figs(counts):
+    """Build the school origin figures once per dataset"""
+    school_province_pie = topk_with_other(counts['propinsi_asal_sekolah'])
+    province = go.Figure(go.Pie(values=school_province_pie.values,
+                                labels=school_province_pie.index))
+    province.update_layout(title="Distribusi Provinsi Asal Sekolah")
+
+    top_schools = counts['asal_sekolah'].head(10)
+    schools = go.Figure(go.Bar(x=top_schools.values, y=top_schools.index,
+                               orientation='h'))
+    schools.update_layout(title="10 Sekolah Asal Terbanyak")
 
-def school_origin_analysis(df):
+    return {'propinsi': province, 'sekolah': schools}
+
+@st.fragment
+def school_origin_analysis(bundle):
     """Analyze school origins"""
+    if not st.sidebar.checkbox('Asal Sekolah', True):
+        return
+
     st.header("🏫 Analisis Asal Sekolah")
-    
+
+    figs = build_school_origin_figs(bundle['counts'])
+
     col1, col2 = st.columns(2)
-    
+
     with col1:
         # School origin by province
         st.subheader("Provinsi Asal Sekolah")
-        school_province = df['propinsi_asal_sekolah'].value_counts()
-        fig = px.pie(values=school_province.values, names=school_province.index,
-                    title="Distribusi Provinsi Asal Sekolah")
-        st.plotly_chart(fig, use_container_width=True)
-    
+        st.plotly_chart(figs['propinsi'], use_container_width=True)
+
     with col2:
         # Top schools
         st.subheader("Top 10 Asal Sekolah")
-        top_schools = df['asal_sekolah'].value_counts().head(10)
-        fig = px.bar(x=top_schools.values, y=top_schools.index,
-                    orientation='h', title="10 Sekolah Asal Terbanyak")
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(figs['sekolah'], use_container_width=True)
 
-def summary_statistics(df):
+    st.markdown("---")
+
+@st.fragment
+def summary_statistics(bundle):
     """Display summary statistics"""
+    if not st.sidebar.checkbox('Statistik Ringkasan', True):
+        return
+
     st.header("📈 Statistik Ringkasan")
-    
+
+    insights = bundle['insights']
+
     col1, col2, col3, col4 = st.columns(4)
-    
+
     with col1:
-        st.metric("Total Calon Murid", len(df))
-    
+        st.metric("Total Calon Murid", insights['total'])
+
     with col2:
-        st.metric("Jumlah Provinsi", df['alamat_propinsi'].nunique())
-    
+        st.metric("Jumlah Provinsi", insights['jumlah_propinsi'])
+
     with col3:
-        st.metric("Jumlah Sekolah Asal", df['asal_sekolah'].nunique())
-    
+        st.metric("Jumlah Sekolah Asal", insights['jumlah_sekolah'])
+
     with col4:
-        jawa_barat_count = len(df[df['domisili'] == 'JAWA BARAT'])
-        st.metric("Siswa dari Jawa Barat", jawa_barat_count)
-    
+        st.metric("Siswa dari Jawa Barat", insights['jawa_barat'])
+
     # Additional insights
     st.subheader("Insights Utama")
     st.write("""
@@ -334,6 +587,14 @@ def summary_statistics(df):
     5. **Pilihan Sekolah**: Preferensi terhadap jenjang SMP menunjukkan fokus pada pendidikan menengah pertama.
     """)
 
+    st.markdown("---")
+
+# Dashboard sections in display order; each is a fragment that owns its
+# sidebar checkbox
+SECTIONS = (summary_statistics, demographic_analysis, geographical_analysis,
+            school_preference_analysis, parent_education_analysis,
+            parent_occupation_analysis, income_analysis, school_origin_analysis)
+
 def main():
     st.title('📊 Dashboard Analisis Data Pendaftaran Siswa')
     st.markdown("---")
@@ -354,63 +615,28 @@ def main():
             df = load_data(uploaded_file)
             if df is None:
                 return
-            df = clean_data(df)
-            
+            bundle = prepare_data(df)
+            df = bundle['df']
+
             st.sidebar.success(f'✅ Data berhasil dimuat! ({len(df)} records)')
             
             # Sidebar options
             st.sidebar.subheader('Pilih Analisis')
-            show_summary = st.sidebar.checkbox('Statistik Ringkasan', True)
-            show_demographic = st.sidebar.checkbox('Analisis Demografis', True)
-            show_geographic = st.sidebar.checkbox('Analisis Geografis', True)
-            show_preferences = st.sidebar.checkbox('Analisis Preferensi Sekolah', True)
-            show_parent_education = st.sidebar.checkbox('Pendidikan Orang Tua', True)
-            show_parent_occupation = st.sidebar.checkbox('Pekerjaan Orang Tua', True)
-            show_income = st.sidebar.checkbox('Analisis Penghasilan', True)
-            show_school_origin = st.sidebar.checkbox('Asal Sekolah', True)
-            
-            # Main content
-            if show_summary:
-                summary_statistics(df)
-                st.markdown("---")
-            
-            if show_demographic:
-                demographic_analysis(df)
-                st.markdown("---")
-            
-            if show_geographic:
-                geographical_analysis(df)
-                st.markdown("---")
-            
-            if show_preferences:
-                school_preference_analysis(df)
-                st.markdown("---")
-            
-            if show_parent_education:
-                parent_education_analysis(df)
-                st.markdown("---")
-            
-            if show_parent_occupation:
-                parent_occupation_analysis(df)
-                st.markdown("---")
-            
-            if show_income:
-                income_analysis(df)
-                st.markdown("---")
-            
-            if show_school_origin:
-                school_origin_analysis(df)
-                st.markdown("---")
-            
-            # Data preview
+
+            # Each section is a fragment that owns its checkbox, so toggling
+            # one re-runs only that section instead of the whole page
+            for section in SECTIONS:
+                section(bundle)
+
+            # Data preview (capped so large CSVs don't stream fully to the browser)
             with st.expander("👁️ Lihat Data Mentah"):
-                st.dataframe(df)
-                
-                # Download processed data
-                csv = df.to_csv(index=False)
+                st.dataframe(df.head(1000))
+
+                # Download processed data; the callable defers serialization
+                # until the button is actually clicked
                 st.download_button(
                     label="📥 Download Data yang Telah Diproses",
-                    data=csv,
+                    data=lambda: to_csv_bytes(df),
                     file_name='processed_student_data.csv',
                     mime='text/csv'
                 )
@@ -424,14 +650,7 @@ def main():
         
         # Show expected format
         with st.expander("📋 Format Data yang Diharapkan"):
-            expected_columns = [
-                'nama_calon_murid', 'kategori', 'jalur', 'tujuan1', 'tujuan2', 'tujuan3',
-                'kampus1', 'kampus2', 'kampus3', 'domisili', 'alamat_propinsi',
-                'alamat_kabupaten', 'asal_sekolah', 'propinsi_asal_sekolah',
-                'ayah_pendidikan', 'ayah_pekerjaan', 'ayah_penghasilan',
-                'ibu_pendidikan', 'ibu_pekerjaan', 'ibu_penghasilan'
-            ]
-            st.write("Kolom yang diperlukan:", expected_columns)
+            st.write("Kolom yang diperlukan:", EXPECTED_COLUMNS)
 
 if __name__ == '__main__':
     main()